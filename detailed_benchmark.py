@@ -1,16 +1,44 @@
 #!/usr/bin/env python3
+"""Compare images_rs against Pillow (sequential and threaded) on AVIF batches.
+
+The Pillow baseline uses whatever `PIL` is installed. For a stronger baseline,
+install Pillow-SIMD in place of Pillow (it is a drop-in replacement with
+SSE4/AVX2 color conversion):
+
+    pip uninstall -y pillow && CC="cc -mavx2" pip install -U --force-reinstall pillow-simd
+
+Pillow-SIMD has no built-in AVIF support, so pillow-avif-plugin is still needed.
+"""
 
 import time
+import timeit
 import numpy as np
 from PIL import Image
-import parallel_read_avif
+import images_rs
 import glob
+import io
 import concurrent.futures
 import threading
 from pathlib import Path
 import psutil
 import os
 
+# Threads beyond the physical cores this process may run on only add context
+# switches, especially since the AVIF decoders are multi-threaded themselves
+N_PHYS = psutil.cpu_count(logical=False) or os.cpu_count()
+N_AVAIL = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+N_WORKERS = min(N_PHYS, N_AVAIL)
+
+def best_time(func, *args, repeat=5, **kwargs):
+    """Best per-call time of func(*args, **kwargs) over `repeat` rounds.
+    
+    Timer.autorange picks how many calls each round makes, so that a round
+    lasts well above the timer resolution even for single-image batches.
+    """
+    timer = timeit.Timer(lambda: func(*args, **kwargs))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
 def detailed_benchmark():
     """Run detailed benchmarks with different image counts"""
     
@@ -18,6 +46,7 @@ def detailed_benchmark():
     
     print(f"System Info:")
     print(f"CPU cores: {psutil.cpu_count()} ({psutil.cpu_count(logical=False)} physical)")
+    print(f"Worker threads: {N_WORKERS}")
     print(f"Python threads: {threading.active_count()}")
     print()
     
@@ -32,42 +61,45 @@ def detailed_benchmark():
         print(f"=== Testing with {size} AVIF images ===")
         
         # Warm up (file system cache)
-        for path in test_paths:
-            with Image.open(path) as img:
-                pass
-        
-        # Test Pillow Sequential
-        times = []
-        for _ in range(5):  # Multiple runs for accuracy
-            start = time.perf_counter()
-            pillow_result = pillow_read_sequential(test_paths)
-            end = time.perf_counter()
-            times.append(end - start)
-        pillow_seq_time = min(times)
+        pillow_result = pillow_read_sequential(test_paths)
+        rust_result = images_rs.read(test_paths)
         pillow_success = len(pillow_result['images'])
+        rust_success = sum(1 for img in rust_result if img is not None)
         
-        # Test Pillow Threaded
-        times = []
-        for _ in range(5):
-            start = time.perf_counter()
-            pillow_thread_result = pillow_read_threaded(test_paths, max_workers=4)
-            end = time.perf_counter()
-            times.append(end - start)
-        pillow_thread_time = min(times)
+        pillow_seq_time = best_time(pillow_read_sequential, test_paths)
+        pillow_thread_time = best_time(pillow_read_threaded, test_paths, max_workers=N_WORKERS)
+        rust_time = best_time(images_rs.read, test_paths)
         
-        # Test Rust Parallel
-        times = []
-        for _ in range(5):
-            start = time.perf_counter()
-            rust_result = parallel_read_avif.read_images_parallel(test_paths)
-            end = time.perf_counter()
-            times.append(end - start)
-        rust_time = min(times)
-        rust_success = len(rust_result['images'])
+        # Same decoders fed from memory: files are read once up front, so the
+        # repeated runs do not include opening and reading them
+        buffers = load_bytes(test_paths)
+        io_buffer = bytearray(max((len(buffer) for buffer in buffers), default=0))
+        io_time = best_time(read_files_into, test_paths, io_buffer)
+        # Unlike the decode pools, the I/O pool is not limited to the core count:
+        # its threads spend their time blocked in read() with the GIL released,
+        # and keeping many reads in flight lets the storage device work through a
+        # deeper queue. It is created outside the timed region so that thread
+        # start-up is not counted as I/O (autorange's calibration calls spawn them).
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(32, size))) as io_executor:
+            concurrent_io_time = best_time(read_files_concurrently, test_paths, io_executor)
+            buffered_io_time = best_time(read_files_concurrently, test_paths, io_executor,
+                                         reader=read_file_buffered)
+        pillow_mem_time = best_time(pillow_decode_threaded, buffers, max_workers=N_WORKERS)
+        rust_mem_time = best_time(images_rs.decode, buffers)
         
         print(f"Pillow Sequential: {pillow_seq_time:.4f}s ({pillow_success} images)")
         print(f"Pillow Threaded:   {pillow_thread_time:.4f}s")
         print(f"Rust Parallel:     {rust_time:.4f}s ({rust_success} images)")
+        print(f"File I/O Only:     {io_time:.4f}s")
+        print(f"Concurrent I/O:    {concurrent_io_time:.4f}s (buffered open/read: {buffered_io_time:.4f}s)")
+        print(f"Pillow In-Memory:  {pillow_mem_time:.4f}s")
+        print(f"Rust In-Memory:    {rust_mem_time:.4f}s")
+        
+        # Results only line up index-for-index when both sides read every image
+        if pillow_success == rust_success == size:
+            max_diff = max(max_abs_diff(rust_img, pillow_img)
+                           for rust_img, (pillow_img, _, _) in zip(rust_result, pillow_result['images']))
+            print(f"Max pixel difference (Rust vs Pillow): {max_diff}")
         
         if pillow_seq_time > 0:
             print(f"Rust vs Pillow Sequential: {pillow_seq_time/rust_time:.2f}x")
@@ -75,6 +107,14 @@ def detailed_benchmark():
             print(f"Rust vs Pillow Threaded:   {pillow_thread_time/rust_time:.2f}x")
         print()
 
+def max_abs_diff(a, b):
+    """Largest per-channel difference between two uint8 images.
+    
+    Stays in uint8 (max - min never underflows) instead of upcasting both
+    arrays to int64 for a signed subtraction.
+    """
+    return int((np.maximum(a, b) - np.minimum(a, b)).max())
+
 def pillow_read_sequential(paths):
     """Read images sequentially using Pillow"""
     results = []
@@ -83,60 +123,114 @@ def pillow_read_sequential(paths):
     for i, path in enumerate(paths):
         try:
             with Image.open(path) as img:
-                rgb_img = img.convert('RGB')
-                array = np.array(rgb_img)
-                results.append((array, rgb_img.size[0], rgb_img.size[1]))
+                # Decode up front: Pillow's codecs release the GIL while they run
+                img.load()
+                width, height = img.size
+                # convert() copies the whole image even when it is already RGB
+                array = np.asarray(img if img.mode == 'RGB' else img.convert('RGB'))
+                results.append((array, width, height))
         except Exception as e:
             errors.append((i, str(e)))
     
     return {"images": results, "errors": errors}
 
+def load_bytes(paths):
+    """Read each file into memory"""
+    buffers = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            buffers.append(f.read())
+    return buffers
+
+def read_files_into(paths, buffer):
+    """Read each file into the same preallocated buffer and return the total bytes read.
+    
+    Measures raw file I/O: sizes come from os.stat, so there is one unbuffered
+    read per file and no allocation or buffer growth inside the loop.
+    """
+    view = memoryview(buffer)
+    total = 0
+    for path in paths:
+        size = os.stat(path).st_size
+        with open(path, 'rb', buffering=0) as f:
+            total += f.readinto(view[:size])
+    return total
+
+def read_files_concurrently(paths, executor, reader=None):
+    """Read all files on `executor` with `reader` and return the total bytes read"""
+    return sum(executor.map(reader or read_file_size, paths))
+
+def read_file_buffered(path):
+    """Baseline for read_file_size: a buffered Python file object, no hints"""
+    with open(path, 'rb') as f:
+        return len(f.read())
+
+def read_file_size(path):
+    """Read one whole file and return its size in bytes.
+    
+    The files are in the page cache after the warm-up, so against
+    read_file_buffered this shows the saved syscalls and copies only; the
+    read-ahead hint matters for cold reads, which this benchmark does not time.
+    """
+    # One positional read of the exact file size, without a Python file object;
+    # the sequential hint lets the kernel read ahead the whole file
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        size = os.fstat(fd).st_size
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        if hasattr(os, "pread"):
+            return len(os.pread(fd, size, 0))
+        return len(os.read(fd, size))
+    finally:
+        os.close(fd)
+
+def pillow_decode_threaded(buffers, max_workers=None):
+    """Decode in-memory images using Pillow with ThreadPoolExecutor"""
+    # BytesIO shares the buffer of a bytes object until it is written to, so
+    # this neither copies the data nor needs a stream reused across threads
+    return pillow_read_threaded([io.BytesIO(buffer) for buffer in buffers], max_workers)
+
 def pillow_read_threaded(paths, max_workers=None):
     """Read images using Pillow with ThreadPoolExecutor"""
     def read_single(path):
         try:
             with Image.open(path) as img:
-                rgb_img = img.convert('RGB')
-                return np.array(rgb_img), rgb_img.size[0], rgb_img.size[1]
+                # Decode up front: Pillow's codecs release the GIL while they run
+                img.load()
+                width, height = img.size
+                rgb_img = img if img.mode == 'RGB' else img.convert('RGB')
+                return (np.asarray(rgb_img), width, height), None
         except Exception as e:
-            raise e
+            return None, str(e)
     
     results = []
     errors = []
     
+    # executor.map yields in submission order, so results already line up with paths
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_index = {executor.submit(read_single, path): i 
-                          for i, path in enumerate(paths)}
-        
-        for future in concurrent.futures.as_completed(future_to_index):
-            index = future_to_index[future]
-            try:
-                result = future.result()
-                results.append((index, result[0], result[1], result[2]))
-            except Exception as e:
-                errors.append((index, str(e)))
-    
-    # Sort results by original index
-    results.sort(key=lambda x: x[0])
-    final_results = [(r[1], r[2], r[3]) for r in results]
+        for i, (result, error) in enumerate(executor.map(read_single, paths)):
+            if error is None:
+                results.append(result)
+            else:
+                errors.append((i, error))
     
-    return {"images": final_results, "errors": errors}
+    return {"images": results, "errors": errors}
 
 def test_overhead():
     """Test the overhead of different approaches"""
     print("=== Overhead Analysis ===")
     
     # Test Python list creation overhead
-    avif_paths = sorted(glob.glob("images/test_avif_*.avif"))[:5]
-    
     start = time.perf_counter()
     for _ in range(1000):
-        result = parallel_read_avif.read_images_parallel([])  # Empty list
+        result = images_rs.read([])  # Empty list
     end = time.perf_counter()
     print(f"Rust function call overhead (1000 calls): {(end-start)*1000:.4f}ms")
     
     # Test numpy array creation overhead  
-    test_data = np.random.randint(0, 256, (100, 100, 3), dtype=np.uint8)
+    rng = np.random.default_rng(0xA71F)
+    test_data = rng.integers(0, 256, (100, 100, 3), dtype=np.uint8)
     
     start = time.perf_counter()
     for _ in range(1000):
@@ -145,5 +239,7 @@ def test_overhead():
     print(f"NumPy array creation overhead (1000 calls): {(end-start)*1000:.4f}ms")
 
 if __name__ == "__main__":
+    # Same worker count as the Pillow thread pool, created once for the whole run
+    images_rs.init_pool(N_WORKERS)
     detailed_benchmark()
     test_overhead()
\ No newline at end of file
@@ -1,109 +1,172 @@
 #!/usr/bin/env python3
 
+import hashlib
+import json
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from PIL import Image
 import os
+import sys
 
-def create_test_images():
+MANIFEST_PATH = os.path.join("images", "manifest.json")
+
+def dataset_key():
+    """Hash of this script, so any change to the generators invalidates the cache"""
+    with open(__file__, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def load_cached_images(key):
+    """Return the cached image paths if the manifest matches `key` and all files exist"""
+    try:
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    paths = manifest.get("paths", [])
+    if manifest.get("key") != key or not all(os.path.exists(p) for p in paths):
+        return None
+    return paths
+
+@lru_cache(maxsize=16)
+def coordinate_grid(height, width):
+    """Broadcastable row (height x 1) and column (1 x width) index grids.
+    
+    Open grids hold height + width values rather than height * width, and are
+    cached per size. They are read-only because callers share them.
+    """
+    yy, xx = np.ogrid[:height, :width]
+    yy.setflags(write=False)
+    xx.setflags(write=False)
+    return yy, xx
+
+def make_png(i):
+    """Generate the i-th PNG test image and return its path"""
+    # Create random colored images of different sizes
+    width = 50 + (i * 10) % 200  # Vary width from 50 to 250
+    height = 50 + (i * 15) % 200  # Vary height from 50 to 250
+    
+    # Create different patterns
+    if i % 4 == 0:
+        # Random noise, seeded per image: forked workers would otherwise
+        # all inherit the same global RNG state and produce identical images
+        arr = np.random.default_rng(i).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    elif i % 4 == 1:
+        # Solid colors
+        color = np.array([(i * 10) & 0xFF, (i * 20) & 0xFF, (i * 30) & 0xFF], dtype=np.uint8)
+        arr = np.broadcast_to(color, (height, width, 3)).copy()
+    elif i % 4 == 2:
+        # Gradient
+        yy, _ = coordinate_grid(height, width)
+        arr = np.empty((height, width, 3), dtype=np.uint8)
+        arr[..., 0] = (yy * 255) // height
+        arr[..., 1] = ((height - yy) * 255) // height
+        arr[..., 2] = 128
+    else:
+        # Checkerboard pattern
+        yy, xx = coordinate_grid(height, width)
+        mask = ((xx // 10 + yy // 10) & 1).astype(np.uint8) * 255
+        arr = np.broadcast_to(mask[:, :, None], (height, width, 3)).copy()
+    
+    img = Image.fromarray(arr)
+    path = f"images/test_png_{i:02d}.png"
+    img.save(path)
+    print(f"Generated {path} ({width}x{height})")
+    return path
+
+def make_jpeg(i):
+    """Generate the i-th JPEG test image and return its path"""
+    width = 100 + (i * 20) % 300
+    height = 100 + (i * 25) % 300
+    
+    # Create vibrant patterns for JPEG
+    yy, xx = coordinate_grid(height, width)
+    arr = np.empty((height, width, 3), dtype=np.uint8)
+    arr[..., 0] = (xx * 255) // width
+    arr[..., 1] = (yy * 255) // height
+    arr[..., 2] = ((xx + yy) * 255) // (width + height)
+    
+    img = Image.fromarray(arr)
+    path = f"images/test_jpeg_{i:02d}.jpg"
+    img.save(path, "JPEG", quality=85)
+    print(f"Generated {path} ({width}x{height})")
+    return path
+
+def make_avif(i):
+    """Generate the i-th AVIF test image and return its path"""
+    width = 80 + (i * 15) % 150
+    height = 80 + (i * 18) % 150
+    
+    # Create smooth gradients (good for AVIF compression)
+    center_x, center_y = width // 2, height // 2
+    yy, xx = coordinate_grid(height, width)
+    dist = np.hypot(xx - center_x, yy - center_y)
+    ratio = dist / max(np.hypot(center_x, center_y), 1e-6)
+    
+    arr = np.empty((height, width, 3), dtype=np.uint8)
+    arr[..., 0] = (255 * ratio).astype(np.uint8)
+    arr[..., 1] = (255 * (1 - ratio)).astype(np.uint8)
+    arr[..., 2] = (128 + 127 * np.sin(dist / 10)).astype(np.uint8)
+    
+    img = Image.fromarray(arr)
+    path = f"images/test_avif_{i:02d}.avif"
+    # Let the encoder split larger images into tiles so dav1d can
+    # decode them with several threads. One encoder thread per worker
+    # process, as the images are encoded in parallel.
+    img.save(path, "AVIF", quality=80, speed=6, autotiling=True, max_threads=1)
+    print(f"Generated {path} ({width}x{height})")
+    return path
+
+def create_test_images(force=False):
     """Generate 50 test images in various formats"""
     
     # Create images directory if it doesn't exist
     os.makedirs("images", exist_ok=True)
     
+    # Encoding (AVIF in particular) is slow, so reuse the previous run if nothing changed
+    key = dataset_key()
+    if not force:
+        cached = load_cached_images(key)
+        if cached is not None:
+            print(f"Reusing {len(cached)} cached test images (pass --force to regenerate)")
+            return cached
+    
     # Remove existing test images to start fresh
     for f in os.listdir("images"):
         if f.startswith("test_"):
             os.remove(os.path.join("images", f))
     
-    image_paths = []
-    
-    # Generate 20 PNG images
-    for i in range(20):
-        # Create random colored images of different sizes
-        width = 50 + (i * 10) % 200  # Vary width from 50 to 250
-        height = 50 + (i * 15) % 200  # Vary height from 50 to 250
-        
-        # Create different patterns
-        if i % 4 == 0:
-            # Random noise
-            arr = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
-        elif i % 4 == 1:
-            # Solid colors
-            color = [i * 10 % 256, (i * 20) % 256, (i * 30) % 256]
-            arr = np.full((height, width, 3), color, dtype=np.uint8)
-        elif i % 4 == 2:
-            # Gradient
-            arr = np.zeros((height, width, 3), dtype=np.uint8)
-            for y in range(height):
-                arr[y, :, 0] = (y * 255) // height
-                arr[y, :, 1] = ((height - y) * 255) // height
-                arr[y, :, 2] = 128
-        else:
-            # Checkerboard pattern
-            arr = np.zeros((height, width, 3), dtype=np.uint8)
-            for y in range(height):
-                for x in range(width):
-                    if (x // 10 + y // 10) % 2:
-                        arr[y, x] = [255, 255, 255]
-                    else:
-                        arr[y, x] = [0, 0, 0]
-        
-        img = Image.fromarray(arr)
-        path = f"images/test_png_{i:02d}.png"
-        img.save(path)
-        image_paths.append(path)
-        print(f"Generated {path} ({width}x{height})")
-    
-    # Generate 15 JPEG images
-    for i in range(15):
-        width = 100 + (i * 20) % 300
-        height = 100 + (i * 25) % 300
-        
-        # Create vibrant patterns for JPEG
-        arr = np.zeros((height, width, 3), dtype=np.uint8)
-        for y in range(height):
-            for x in range(width):
-                arr[y, x, 0] = (x * 255) // width
-                arr[y, x, 1] = (y * 255) // height
-                arr[y, x, 2] = ((x + y) * 255) // (width + height)
+    # Every image is independent, so generate and encode them in worker
+    # processes. All jobs are submitted up front; results keep their order.
+    with ProcessPoolExecutor() as executor:
+        png_paths = executor.map(make_png, range(20))
+        jpeg_paths = executor.map(make_jpeg, range(15))
+        avif_paths = executor.map(make_avif, range(15))
         
-        img = Image.fromarray(arr)
-        path = f"images/test_jpeg_{i:02d}.jpg"
-        img.save(path, "JPEG", quality=85)
-        image_paths.append(path)
-        print(f"Generated {path} ({width}x{height})")
+        image_paths = list(png_paths) + list(jpeg_paths)
+        complete = True
+        try:
+            image_paths.extend(avif_paths)
+        except Exception as e:
+            complete = False
+            print(f"AVIF generation failed for some images: {e}")
+            print("This might be due to pillow-avif not being installed or configured properly")
     
-    # Generate 15 AVIF images (convert some PNGs to AVIF)
-    try:
-        for i in range(15):
-            width = 80 + (i * 15) % 150
-            height = 80 + (i * 18) % 150
-            
-            # Create smooth gradients (good for AVIF compression)
-            arr = np.zeros((height, width, 3), dtype=np.uint8)
-            center_x, center_y = width // 2, height // 2
-            
-            for y in range(height):
-                for x in range(width):
-                    dist = np.sqrt((x - center_x)**2 + (y - center_y)**2)
-                    max_dist = np.sqrt(center_x**2 + center_y**2)
-                    
-                    arr[y, x, 0] = int(255 * (dist / max_dist)) if max_dist > 0 else 0
-                    arr[y, x, 1] = int(255 * (1 - dist / max_dist)) if max_dist > 0 else 255
-                    arr[y, x, 2] = int(128 + 127 * np.sin(dist / 10))
-            
-            img = Image.fromarray(arr)
-            path = f"images/test_avif_{i:02d}.avif"
-            img.save(path, "AVIF", quality=80)
-            image_paths.append(path)
-            print(f"Generated {path} ({width}x{height})")
-    except Exception as e:
-        print(f"AVIF generation failed for some images: {e}")
-        print("This might be due to pillow-avif not being installed or configured properly")
+    if complete:
+        with open(MANIFEST_PATH, "w") as f:
+            json.dump({"key": key, "paths": image_paths}, f, indent=2)
+    else:
+        # Never cache a partial dataset: the next run must retry the missing
+        # images (e.g. once the AVIF plugin is installed) instead of reusing it
+        try:
+            os.remove(MANIFEST_PATH)
+        except FileNotFoundError:
+            pass
     
     return image_paths
 
 if __name__ == "__main__":
-    paths = create_test_images()
+    paths = create_test_images(force="--force" in sys.argv)
     print(f"\nGenerated {len(paths)} test images total")
     print("Image generation completed!")
\ No newline at end of file
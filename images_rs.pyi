@@ -22,9 +22,8 @@ def read(
         paths: List of file paths to image files. Can be strings or Path-like objects.
             Supports both absolute and relative paths.
         num_threads: Optional number of threads to use for parallel processing.
-            If None, uses the default thread pool size. Note that the global thread
-            pool can only be initialized once per process - subsequent calls with
-            different num_threads will be ignored.
+            If None, the global thread pool is used (see `init_pool`). Otherwise
+            exactly this many threads decode the images for this call.
     
     Returns:
         List of numpy arrays with shape (height, width, 3) representing RGB images.
@@ -41,6 +40,12 @@ def read(
         - If extension-based detection fails, it falls back to content-based detection
         - Failed image reads are returned as None rather than raising exceptions
         - The function is optimized for batch processing of multiple images
+        - The GIL is released while images are decoded, so calls from several
+          Python threads run concurrently
+        - Files of 64 KiB or more are memory-mapped rather than copied into
+          memory. If another process truncates such a file while it is being
+          decoded, the process is killed by SIGBUS; this is not reported as a
+          failed read (None). Do not read files that are still being written.
         
     Example:
         >>> import images_rs
@@ -49,4 +54,63 @@ def read(
         >>> if images[0] is not None:
         ...     print(f"First image shape: {images[0].shape}")
     """
-    ...
\ No newline at end of file
+    ...
+
+def decode(
+    buffers: List[bytes],
+    num_threads: Optional[int] = None
+) -> List[Optional[np.ndarray]]:
+    """Decode multiple in-memory encoded images in parallel.
+    
+    This is the counterpart of `read` for image data that is already in memory,
+    such as files read once and decoded many times or images received over the
+    network. Decoding does not touch the file system.
+    
+    Args:
+        buffers: List of `bytes` objects, each holding one encoded image file.
+        num_threads: Optional number of threads to use for parallel processing,
+            with the same behavior as in `read`.
+    
+    Returns:
+        List of numpy arrays with shape (height, width, 3) and dtype uint8, in
+        the same order as `buffers`. Failed decodes return None at the
+        corresponding index.
+    
+    Raises:
+        TypeError: If an element of buffers is not a bytes object.
+    
+    Note:
+        - The format is detected from the content, since there is no file extension
+        - The buffers are read in place, without being copied
+    
+    Example:
+        >>> import images_rs
+        >>> with open('photo.avif', 'rb') as f:
+        ...     data = f.read()
+        >>> images = images_rs.decode([data])
+    """
+    ...
+
+def init_pool(num_threads: Optional[int] = None) -> bool:
+    """Create the global worker thread pool ahead of the first call.
+    
+    The global pool is used by `read` and `decode` when `num_threads` is None.
+    Without this, it is created lazily inside the first such call, which then
+    pays for spawning every worker thread. The pool is reused by all later calls
+    for the lifetime of the process.
+    
+    Args:
+        num_threads: Optional number of worker threads. If None, one thread per
+            logical CPU is used.
+    
+    Returns:
+        True if the pool was created, False if it was already initialized (by an
+        earlier `init_pool`, `read` or `decode` call), in which case `num_threads`
+        is ignored.
+    
+    Example:
+        >>> import images_rs
+        >>> images_rs.init_pool(8)
+        True
+    """
+    ...
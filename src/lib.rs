@@ -7,6 +7,8 @@
 //! # Features
 //! - Parallel image processing using Rayon
 //! - Support for multiple formats: PNG, JPEG, AVIF, WebP, GIF, TIFF, BMP
+//! - AVIF decoding through libdav1d (`dav1d` feature, enabled by default)
+//! - PNG decoding through zune-png (SIMD inflate and unfiltering)
 //! - Fast format detection based on file extensions
 //! - Automatic RGB conversion
 //! - Graceful error handling (returns None for failed reads)
@@ -26,12 +28,23 @@
 //! ```
 
 use pyo3::prelude::*;
-use pyo3::types::{PyDict, PyList};
+use pyo3::types::{PyBytes, PyDict, PyList};
 use numpy::{PyArray1, PyArray3};
 use numpy::ndarray::Array3;
 use rayon::prelude::*;
+use rayon::ThreadPool;
 use image::{ImageReader, ImageError, ImageFormat};
+#[cfg(unix)]
+use memmap2::Advice;
+use memmap2::Mmap;
+use std::collections::HashMap;
+use std::fs;
+use std::io::{Cursor, Read};
 use std::path::Path;
+use std::sync::{Arc, Mutex, OnceLock};
+use zune_core::colorspace::ColorSpace;
+use zune_core::result::DecodingResult;
+use zune_png::PngDecoder;
 
 /// Internal error type for image reading operations.
 /// 
@@ -92,6 +105,112 @@ fn guess_format_from_extension(path: &str) -> Option<ImageFormat> {
     }
 }
 
+/// Create the global thread pool used by `read` ahead of the first call.
+///
+/// Rayon otherwise spawns its worker threads lazily inside the first `read`,
+/// which puts thread creation into that call's latency. The pool lives for the
+/// rest of the process and is reused by every subsequent `read` that does not
+/// request its own `num_threads`.
+///
+/// # Arguments
+/// * `num_threads` - Optional number of worker threads (defaults to one per logical CPU)
+///
+/// # Returns
+/// * `bool` - `True` if the pool was created, `False` if it was already initialized
+#[pyfunction]
+#[pyo3(signature = (num_threads = None))]
+fn init_pool(num_threads: Option<usize>) -> bool {
+    // Rayon's global thread pool can only be initialized once per process
+    let mut builder = rayon::ThreadPoolBuilder::new();
+    if let Some(threads) = num_threads {
+        builder = builder.num_threads(threads);
+    }
+    builder.build_global().is_ok()
+}
+
+/// Dedicated pools built for explicit `num_threads` values, kept for the rest
+/// of the process so repeated calls do not respawn their worker threads.
+static CUSTOM_POOLS: OnceLock<Mutex<HashMap<usize, Arc<ThreadPool>>>> = OnceLock::new();
+
+/// Run `op` on a thread pool with `num_threads` workers.
+///
+/// With `None`, `op` runs on Rayon's global pool. Otherwise a dedicated pool of
+/// exactly that size is used, so a caller asking for one thread gets one thread
+/// regardless of how the global pool was configured. Dedicated pools are built
+/// on first use of each size and then reused.
+///
+/// # Arguments
+/// * `num_threads` - Optional number of worker threads
+/// * `op` - Closure containing the parallel work
+///
+/// # Returns
+/// * `PyResult<R>` - The closure's result, or a `RuntimeError` if the pool cannot be built
+fn run_in_pool<OP, R>(num_threads: Option<usize>, op: OP) -> PyResult<R>
+where
+    OP: FnOnce() -> R + Send,
+    R: Send,
+{
+    match num_threads {
+        Some(threads) => {
+            let pool = {
+                // Only held for the lookup: calls sharing a size may run concurrently
+                let mut pools = CUSTOM_POOLS
+                    .get_or_init(Default::default)
+                    .lock()
+                    .unwrap_or_else(|poisoned| poisoned.into_inner());
+                match pools.get(&threads) {
+                    Some(pool) => Arc::clone(pool),
+                    None => {
+                        let pool = Arc::new(
+                            rayon::ThreadPoolBuilder::new()
+                                .num_threads(threads)
+                                .build()
+                                .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(format!("Thread pool error: {}", e)))?,
+                        );
+                        pools.insert(threads, Arc::clone(&pool));
+                        pool
+                    }
+                }
+            };
+            Ok(pool.install(op))
+        }
+        None => Ok(op()),
+    }
+}
+
+/// Encoded bytes worth giving a rayon task to itself; smaller images are
+/// grouped so the per-task scheduling cost is not paid for every tiny file.
+const MIN_TASK_BYTES: u64 = 256 * 1024;
+
+/// Minimum number of consecutive images each rayon task should decode.
+///
+/// Must be called from inside the pool that runs the work, as the thread
+/// count is taken from the current pool.
+///
+/// # Arguments
+/// * `count` - Number of images in the batch
+/// * `total_bytes` - The batch's total encoded size, if known without extra
+///   I/O; without it, tasks are sized from the image count alone
+///
+/// # Returns
+/// * `usize` - Value for `with_min_len`, at least 1
+fn min_task_len(count: usize, total_bytes: Option<u64>) -> usize {
+    // Small batches cannot save much
+    if count < 16 {
+        return 1;
+    }
+    // Still leave a few tasks per thread so work stealing can balance the load
+    let by_count = (count / (rayon::current_num_threads() * 4)).max(1);
+    match total_bytes {
+        Some(total) => {
+            let average = (total / count as u64).max(1);
+            let by_size = (MIN_TASK_BYTES / average).max(1) as usize;
+            by_size.min(by_count)
+        }
+        None => by_count,
+    }
+}
+
 /// Read multiple images in parallel and return them as numpy arrays.
 ///
 /// This is the main entry point for the Python extension. It efficiently reads
@@ -110,26 +229,17 @@ fn guess_format_from_extension(path: &str) -> Option<ImageFormat> {
 /// - Automatic RGB conversion regardless of input format
 /// - Fast format detection using file extensions with fallback to content detection
 /// - Parallel processing using Rayon for optimal performance
+/// - The GIL is released while decoding, so other Python threads keep running
 /// - Graceful error handling - failed reads return None instead of crashing
-/// - Direct memory management for efficient numpy array creation
+///   (except a file truncated while it is memory-mapped, which raises SIGBUS)
+/// - Zero-copy handoff: decoded buffers become the numpy arrays' memory
 ///
 /// # Thread Pool Behavior
-/// The global thread pool can only be initialized once per process. If `num_threads`
-/// is specified on subsequent calls, it will be silently ignored to prevent panics.
+/// Without `num_threads`, work runs on the global thread pool (see `init_pool`).
+/// With `num_threads`, a pool of exactly that many threads is used for this call.
 #[pyfunction]
 #[pyo3(signature = (paths, num_threads = None))]
 fn read(py: Python, paths: &Bound<'_, PyList>, num_threads: Option<usize>) -> PyResult<PyObject> {
-    // Set the number of threads if specified
-    // Note: Rayon's global thread pool can only be initialized once per process
-    if let Some(threads) = num_threads {
-        if let Err(_) = rayon::ThreadPoolBuilder::new()
-            .num_threads(threads)
-            .build_global() 
-        {
-            // Thread pool already initialized, ignore silently
-            // This is expected in testing or multiple function calls
-        }
-    }
     // Extract paths once - handle both strings and Path objects
     let path_strings: Vec<String> = paths
         .iter()
@@ -144,49 +254,261 @@ fn read(py: Python, paths: &Bound<'_, PyList>, num_threads: Option<usize>) -> Py
         })
         .collect::<Result<Vec<_>, _>>()?;
 
-    // Pre-allocate results
-    let mut results = Vec::with_capacity(path_strings.len());
+    // Parallel processing with optimizations. Decoding never touches Python
+    // objects, so release the GIL and let other Python threads run meanwhile.
+    let results = py.allow_threads(|| {
+        run_in_pool(num_threads, || {
+            // Sized from the path count only: a stat per file here would run
+            // serially, before any decoding, and read_rgb stats each file anyway
+            let min_len = min_task_len(path_strings.len(), None);
+
+            // Pre-allocate results in input order. Empty slots are None, so one
+            // that was never written cannot pass for a decoded image.
+            let mut results: Vec<Option<Result<(Vec<u8>, u32, u32), ReadError>>> =
+                (0..path_strings.len()).map(|_| None).collect();
+
+            // Decode mixed batches grouped by extension, so each worker runs the
+            // same codec for a stretch instead of alternating between them. The
+            // sort is stable, so a single-format batch keeps its order. Each
+            // task writes straight into its own slot, so nothing is reordered
+            // or collected afterwards.
+            let mut slots: Vec<_> = results.iter_mut().enumerate().collect();
+            slots.sort_by_key(|(i, _)| Path::new(&path_strings[*i]).extension());
+            slots
+                .par_iter_mut()
+                .with_min_len(min_len)
+                .for_each(|(i, slot)| **slot = Some(read_rgb(&path_strings[*i])));
+
+            results
+                .into_iter()
+                .map(|slot| slot.expect("every slot is written by the parallel map"))
+                .collect::<Vec<_>>()
+        })
+    })?;
+
+    into_py_images(py, results)
+}
+
+/// Decode multiple in-memory encoded images in parallel and return them as numpy arrays.
+///
+/// This is the counterpart of `read` for data that is already in memory, e.g.
+/// files read once and decoded repeatedly, or images received over the network.
+/// No file system access happens during decoding.
+///
+/// # Arguments
+/// * `py` - Python interpreter state
+/// * `buffers` - Python list of `bytes` objects, each holding one encoded image
+/// * `num_threads` - Optional number of threads for parallel processing
+///
+/// # Returns
+/// * `PyResult<PyObject>` - Python list containing numpy arrays or None for failed decodes
+///
+/// # Features
+/// - Format detected from the content (magic bytes), as there is no file extension
+/// - Buffers are borrowed from the `bytes` objects, not copied
+/// - Same RGB conversion, error handling and thread pool behavior as `read`
+#[pyfunction]
+#[pyo3(signature = (buffers, num_threads = None))]
+fn decode(py: Python, buffers: &Bound<'_, PyList>, num_threads: Option<usize>) -> PyResult<PyObject> {
+    // Keep the bytes objects alive while their contents are borrowed
+    let buffers: Vec<Bound<'_, PyBytes>> = buffers
+        .iter()
+        .map(|item| item.downcast_into::<PyBytes>().map_err(PyErr::from))
+        .collect::<PyResult<Vec<_>>>()?;
+    let data: Vec<&[u8]> = buffers.iter().map(|buffer| buffer.as_bytes()).collect();
+
+    // Release the GIL while decoding. `bytes` objects are immutable and
+    // `buffers` holds a reference to each, so the slices stay valid meanwhile.
+    let results = py.allow_threads(|| {
+        run_in_pool(num_threads, || {
+            // Pre-allocate results
+            let mut results = Vec::with_capacity(data.len());
+            let total_bytes = data.iter().map(|bytes| bytes.len() as u64).sum();
+            let min_len = min_task_len(data.len(), Some(total_bytes));
+            data
+                .par_iter()
+                .with_min_len(min_len)
+                .map(|bytes| decode_rgb(bytes, None))
+                .collect_into_vec(&mut results);
+            results
+        })
+    })?;
+
+    into_py_images(py, results)
+}
+
+/// Files at least this large are memory-mapped instead of read into a buffer.
+/// A mapping costs an mmap and a munmap syscall, a page fault per page touched
+/// and, on unmap, a TLB flush on every core running one of our threads; a copy
+/// of 16 pages or fewer is cheaper than that. Not tuned by measurement.
+const MMAP_THRESHOLD: u64 = 64 * 1024;
+
+/// Load one image file and decode it to packed RGB8 pixels.
+///
+/// Small files are read whole in one go (sized from their metadata) rather
+/// than through BufReader's many small read syscalls. Large files are mapped,
+/// so the decoder reads straight from the page cache without first copying
+/// the file into a heap buffer.
+///
+/// # Arguments
+/// * `path` - Path of the image file
+///
+/// # Returns
+/// * `Ok((data, width, height))` - Raw RGB data in row-major order and its dimensions
+/// * `Err(ReadError)` - If the file cannot be read or decoding fails
+fn read_rgb(path: &str) -> Result<(Vec<u8>, u32, u32), ReadError> {
+    let mut file = fs::File::open(path)?;
+    let len = file.metadata()?.len();
+
+    if len < MMAP_THRESHOLD {
+        let mut bytes = Vec::with_capacity(len as usize);
+        file.read_to_end(&mut bytes)?;
+        return decode_rgb(&bytes, Some(path));
+    }
+
+    // SAFETY: the mapping is only read, and only until decoding returns. As with
+    // any mmap, another process modifying the file meanwhile is undefined
+    // behavior: writing to it in place changes the bytes behind a live `&[u8]`,
+    // and truncating it raises SIGBUS. Files that are still being written must
+    // not be read (as documented on `read`).
+    let mmap = unsafe { Mmap::map(&file)? };
+    // Decoders consume the file front to back, so ask for aggressive readahead
+    #[cfg(unix)]
+    let _ = mmap.advise(Advice::Sequential);
+    decode_rgb(&mmap, Some(path))
+}
+
+/// Signature at the start of every PNG file.
+const PNG_SIGNATURE: &[u8] = b"\x89PNG\r\n\x1a\n";
+
+/// Decode one image and convert it to packed RGB8 pixels.
+///
+/// PNGs go to zune-png directly; everything else (and any PNG zune-png
+/// rejects) goes through the `image` crate.
+///
+/// # Arguments
+/// * `bytes` - The encoded image
+/// * `path` - Source path used for extension-based format detection, if any
+///
+/// # Returns
+/// * `Ok((data, width, height))` - Raw RGB data in row-major order and its dimensions
+/// * `Err(ReadError)` - If the format is unknown or decoding fails
+fn decode_rgb(bytes: &[u8], path: Option<&str>) -> Result<(Vec<u8>, u32, u32), ReadError> {
+    if bytes.starts_with(PNG_SIGNATURE) {
+        if let Some(decoded) = decode_png(bytes) {
+            return Ok(decoded);
+        }
+    }
+
+    let mut reader = ImageReader::new(Cursor::new(bytes));
+
+    // Try format from extension first (much faster)
+    if let Some(format) = path.and_then(guess_format_from_extension) {
+        reader.set_format(format);
+    } else {
+        // Only do expensive format guessing if extension fails
+        reader = reader.with_guessed_format()?;
+    }
     
-    // Parallel processing with optimizations
-    path_strings
-        .par_iter()
-        .map(|path| -> Result<(Vec<u8>, u32, u32), ReadError> {
-            // Try format from extension first (much faster)
-            let mut reader = ImageReader::open(path)?;
-            
-            if reader.format().is_none() {
-                if let Some(format) = guess_format_from_extension(path) {
-                    reader.set_format(format);
-                } else {
-                    // Only do expensive format guessing if extension fails
-                    reader = reader.with_guessed_format()?;
-                }
+    // Decode and convert in one go. into_rgb8 reuses the decoder's buffer when
+    // it is already RGB8 (color JPEGs), where to_rgb8 would allocate and fill
+    // a second image. Other layouts, such as AVIF's RGBA8, are still converted.
+    let img = reader.decode()?;
+    let rgb_img = img.into_rgb8();
+    let (width, height) = rgb_img.dimensions();
+    
+    // Direct access to raw data (no copying)
+    let data = rgb_img.into_raw();
+    
+    Ok((data, width, height))
+}
+
+/// Decode a PNG with zune-png and convert it to packed RGB8 pixels.
+///
+/// zune-png unfilters and inflates with SIMD, where the `image` crate's PNG
+/// decoder does not. Palettes and 1, 2 and 4-bit samples are expanded by the
+/// decoder itself; 16-bit samples are rounded to 8 bits here exactly as the
+/// `image` crate does, so both paths return identical pixels (checked for
+/// every PNG color type and bit depth by `test_png_color_types`).
+///
+/// # Returns
+/// * `Some((data, width, height))` - Raw RGB data in row-major order and its dimensions
+/// * `None` - If zune-png fails, so the caller can fall back to the `image` crate
+fn decode_png(bytes: &[u8]) -> Option<(Vec<u8>, u32, u32)> {
+    let mut decoder = PngDecoder::new(bytes);
+    let pixels = match decoder.decode().ok()? {
+        DecodingResult::U8(pixels) => pixels,
+        // Round to nearest, v * 255 / 65535, rather than keeping the high byte
+        // (which zune-png's strip_to_8bit option would do)
+        DecodingResult::U16(pixels) => pixels
+            .iter()
+            .map(|&v| ((u32::from(v) + 128) / 257) as u8)
+            .collect(),
+        _ => return None,
+    };
+    let (width, height) = decoder.get_dimensions()?;
+
+    let data = match decoder.get_colorspace()? {
+        // Already packed RGB8: hand the buffer over as is
+        ColorSpace::RGB => pixels,
+        ColorSpace::RGBA => {
+            let mut rgb = Vec::with_capacity(width * height * 3);
+            for px in pixels.chunks_exact(4) {
+                rgb.extend_from_slice(&px[..3]);
             }
-            
-            // Decode and convert in one go
-            let img = reader.decode()?;
-            let rgb_img = img.to_rgb8();
-            let (width, height) = rgb_img.dimensions();
-            
-            // Direct access to raw data (no copying)
-            let data = rgb_img.into_raw();
-            
-            Ok((data, width, height))
-        })
-        .collect_into_vec(&mut results);
+            rgb
+        }
+        ColorSpace::Luma => {
+            let mut rgb = Vec::with_capacity(width * height * 3);
+            for &v in &pixels {
+                rgb.extend_from_slice(&[v, v, v]);
+            }
+            rgb
+        }
+        ColorSpace::LumaA => {
+            let mut rgb = Vec::with_capacity(width * height * 3);
+            for px in pixels.chunks_exact(2) {
+                rgb.extend_from_slice(&[px[0], px[0], px[0]]);
+            }
+            rgb
+        }
+        _ => return None,
+    };
 
+    // Anything shorter than a full frame is a decoder quirk; let `image` handle it
+    if data.len() != width * height * 3 {
+        return None;
+    }
+
+    Some((data, width as u32, height as u32))
+}
+
+/// Convert decode results into a Python list of numpy arrays.
+///
+/// # Arguments
+/// * `py` - Python interpreter state
+/// * `results` - Per-image decode results, in input order
+///
+/// # Returns
+/// * `PyResult<PyObject>` - Python list with an array per image, or None where decoding failed
+fn into_py_images(
+    py: Python,
+    results: Vec<Result<(Vec<u8>, u32, u32), ReadError>>,
+) -> PyResult<PyObject> {
     // Process results into Python objects
     let mut images = Vec::with_capacity(results.len());
 
     for (i, result) in results.into_iter().enumerate() {
         match result {
             Ok((data, width, height)) => {
-                // Create numpy array directly from raw data with proper shape
+                // Wrap the decoded Vec in an ndarray with the proper shape (no copy)
                 let array = Array3::from_shape_vec(
                     (height as usize, width as usize, 3),
                     data
                 ).map_err(|e| PyErr::new::<pyo3::exceptions::PyValueError, _>(format!("Array shape error: {}", e)))?;
                 
+                // Hand the allocation itself to NumPy: the array's base object owns
+                // the Vec and frees it with Rust's allocator, so no memcpy happens
                 let py_array = PyArray3::from_owned_array_bound(py, array);
                 images.push(py_array.to_object(py));
             }
@@ -212,8 +534,12 @@ fn read(py: Python, paths: &Bound<'_, PyList>, num_threads: Option<usize>) -> Py
 ///
 /// # Exported Functions
 /// - `read(paths, num_threads=None)` - Read multiple images in parallel
+/// - `decode(buffers, num_threads=None)` - Decode multiple in-memory images in parallel
+/// - `init_pool(num_threads=None)` - Create the global worker thread pool up front
 #[pymodule]
 fn images_rs(_py: Python, m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(read, m)?)?;
+    m.add_function(wrap_pyfunction!(decode, m)?)?;
+    m.add_function(wrap_pyfunction!(init_pool, m)?)?;
     Ok(())
 }
\ No newline at end of file
@@ -3,30 +3,37 @@
 import time
 import numpy as np
 from PIL import Image
-import parallel_read_avif
+import images_rs
 import concurrent.futures
 import glob
 import shutil
 import os
+from operator import itemgetter
+
+# Size every thread pool from the host instead of hard-coding worker counts
+NCPU = os.cpu_count() or 1
 
 def create_large_test_set():
     """Create a larger test set by duplicating existing images"""
     
     base_avifs = sorted(glob.glob("images/test_avif_*.avif"))[:5]  # Use first 5 as templates
     
-    # Create large_test directory
-    os.makedirs("large_test", exist_ok=True)
-    
-    # Clean existing files
-    for f in glob.glob("large_test/*.avif"):
-        os.remove(f)
+    # Start from an empty large_test directory
+    shutil.rmtree("large_test", ignore_errors=True)
+    os.makedirs("large_test")
     
     # Create 100 test images by duplicating the base ones
     large_test_paths = []
     for i in range(100):
         source = base_avifs[i % len(base_avifs)]
         dest = f"large_test/stress_test_{i:03d}.avif"
-        shutil.copy2(source, dest)
+        # Hardlink instead of copying: no data is written and every duplicate
+        # shares one inode, so the page cache holds each file only once
+        try:
+            os.link(source, dest)
+        except OSError:
+            # e.g. large_test on a different file system
+            shutil.copy2(source, dest)
         large_test_paths.append(dest)
     
     print(f"Created {len(large_test_paths)} test images for stress testing")
@@ -35,53 +42,51 @@ def create_large_test_set():
 def pillow_sequential(paths):
     """Pillow sequential reading"""
     results = []
-    start = time.perf_counter()
+    start = time.perf_counter_ns()
     
     for path in paths:
         try:
             with Image.open(path) as img:
-                rgb_img = img.convert('RGB')
-                array = np.array(rgb_img)
-                results.append((array, rgb_img.size[0], rgb_img.size[1]))
+                # convert() copies the whole image even when it is already RGB
+                rgb_img = img if img.mode == 'RGB' else img.convert('RGB')
+                width, height = rgb_img.size
+                array = np.asarray(rgb_img)
+            results.append((array, width, height))
         except Exception as e:
             print(f"Error reading {path}: {e}")
     
-    end = time.perf_counter()
-    return results, end - start
+    elapsed = (time.perf_counter_ns() - start) / 1e9
+    return results, elapsed
 
-def pillow_threaded(paths, max_workers=4):
+def pillow_threaded(paths, max_workers=NCPU):
     """Pillow with ThreadPoolExecutor"""
     def read_single(path):
         try:
             with Image.open(path) as img:
-                rgb_img = img.convert('RGB')
-                return np.array(rgb_img), rgb_img.size[0], rgb_img.size[1]
+                rgb_img = img if img.mode == 'RGB' else img.convert('RGB')
+                array = np.asarray(rgb_img)
+            # The array no longer depends on the image, which can be closed first
+            height, width = array.shape[:2]
+            return array, width, height
         except Exception as e:
-            raise Exception(f"Error reading {path}: {e}")
+            print(f"Error reading {path}: {e}")
+            return None
     
-    results = []
-    start = time.perf_counter()
+    start = time.perf_counter_ns()
     
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_path = {executor.submit(read_single, path): path for path in paths}
-        
-        for future in concurrent.futures.as_completed(future_to_path):
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as e:
-                print(f"Error: {e}")
-    
-    end = time.perf_counter()
-    return results, end - start
+        results = [result for result in executor.map(read_single, paths) if result is not None]
+    
+    elapsed = (time.perf_counter_ns() - start) / 1e9
+    return results, elapsed
 
 def rust_parallel(paths):
     """Our Rust parallel implementation"""
-    start = time.perf_counter()
-    result = parallel_read_avif.read_images_parallel(paths)
-    end = time.perf_counter()
+    start = time.perf_counter_ns()
+    result = images_rs.read(paths)
+    elapsed = (time.perf_counter_ns() - start) / 1e9
     
-    return result['images'], end - start
+    return [img for img in result if img is not None], elapsed
 
 def stress_test():
     """Run stress test with different batch sizes"""
@@ -106,7 +111,7 @@ def stress_test():
         
         # Test each method
         pillow_seq_results, pillow_seq_time = pillow_sequential(test_paths)
-        pillow_thread_results, pillow_thread_time = pillow_threaded(test_paths, max_workers=6)
+        pillow_thread_results, pillow_thread_time = pillow_threaded(test_paths, max_workers=NCPU)
         rust_results, rust_time = rust_parallel(test_paths)
         
         # Find the fastest
@@ -115,7 +120,7 @@ def stress_test():
             'Pillow Thread': pillow_thread_time, 
             'Rust Parallel': rust_time
         }
-        fastest = min(times.keys(), key=lambda k: times[k])
+        fastest, _ = min(times.items(), key=itemgetter(1))
         
         print(f"{batch_size:<10} {pillow_seq_time:<12.4f} {pillow_thread_time:<15.4f} {rust_time:<15.4f} {fastest}")
         
@@ -134,7 +139,18 @@ def stress_test():
         
         print(f"Testing maximum throughput with {len(test_paths)} images...")
         
-        # Multiple runs for accuracy
+        # The pixel count is the same for every run over this file set, so count it
+        # once here rather than from whichever batch happened to run last
+        test_images, _ = rust_parallel(test_paths)
+        pixel_counts = np.fromiter((img.shape[0] * img.shape[1] for img in test_images),
+                                   dtype=np.int64, count=len(test_images))
+        total_pixels = int(pixel_counts.sum())
+        
+        # Warm up Pillow as well (the Rust reader was just run above), so that
+        # no timed run pays for cold caches or first-call setup
+        pillow_threaded(test_paths, max_workers=NCPU)
+        
+        # Multiple runs for accuracy, alternating so both readers see the same cache state
         rust_times = []
         pillow_thread_times = []
         
@@ -142,7 +158,7 @@ def stress_test():
             _, rust_time = rust_parallel(test_paths)
             rust_times.append(rust_time)
             
-            _, pillow_time = pillow_threaded(test_paths, max_workers=8) 
+            _, pillow_time = pillow_threaded(test_paths, max_workers=NCPU)
             pillow_thread_times.append(pillow_time)
         
         best_rust = min(rust_times)
@@ -154,7 +170,6 @@ def stress_test():
         print(f"Speedup: {best_pillow_thread/best_rust:.2f}x")
         
         # Calculate pixels per second
-        total_pixels = sum(img[1] * img[2] for img in rust_results)
         rust_pixels_per_sec = total_pixels / best_rust
         pillow_pixels_per_sec = total_pixels / best_pillow_thread
         
@@ -163,6 +178,8 @@ def stress_test():
         print(f"Pillow: {pillow_pixels_per_sec/1_000_000:.1f} million pixels/sec")
 
 if __name__ == "__main__":
+    # Spawn the Rust worker threads now rather than inside the first timed batch
+    images_rs.init_pool(NCPU)
     stress_test()
     
     # Cleanup
@@ -14,11 +14,11 @@ def test_parallel_read():
     
     print("Testing parallel image reading...")
     
-    start_time = time.time()
+    start_time = time.perf_counter_ns()
     result = images_rs.read(paths, num_threads=4)
-    end_time = time.time()
+    elapsed = (time.perf_counter_ns() - start_time) / 1e9
     
-    print(f"Read {len(paths)} images in {end_time - start_time:.2f} seconds")
+    print(f"Read {len(paths)} images in {elapsed:.2f} seconds")
     
     successful_count = sum(1 for img in result if img is not None)
     error_count = sum(1 for img in result if img is None)
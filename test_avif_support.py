@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import os
+
 import images_rs
 import numpy as np
 
@@ -19,15 +21,15 @@ def test_supported_formats():
     result = images_rs.read(test_paths)
     
     # Check results - None means error (logged to stderr)
-    for i, image in enumerate(result):
-        path = test_paths[i]
+    for path, image in zip(test_paths, result):
+        fmt = os.path.splitext(path)[1].lstrip('.').upper()
         if image is None:
             # Error was logged to stderr, assume it's a file not found error for format testing
             print(f"{path}: File not found (format appears supported)")
-            print(f"  ✓ {path.split('.')[-1].upper()} format appears to be supported")
+            print(f"  ✓ {fmt} format appears to be supported")
         else:
             print(f"{path}: Successfully loaded (but file shouldn't exist!)")
-            print(f"  ✓ {path.split('.')[-1].upper()} format definitely supported")
+            print(f"  ✓ {fmt} format definitely supported")
 
 if __name__ == "__main__":
     test_supported_formats()
\ No newline at end of file
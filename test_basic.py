@@ -2,17 +2,170 @@
 """Basic tests for CI/CD pipeline"""
 
 import os
+import struct
 import tempfile
+import zlib
+from functools import lru_cache
 
 import numpy as np
 from PIL import Image
 
 import images_rs
 
+# Fixture images are encoded once per process into one shared directory, which
+# is removed when the interpreter exits. PNG encoding costs more than the
+# decode under test, so no test writes (or deletes) its own files.
+FIXTURE_DIR = tempfile.TemporaryDirectory(prefix="images_rs_test_")
+
+
+def make_stripes():
+    """Red, green and blue horizontal stripes"""
+    img_array = np.zeros((3, 3, 3), dtype=np.uint8)
+    img_array[0, :, 0] = 255  # Red stripe
+    img_array[1, :, 1] = 255  # Green stripe
+    img_array[2, :, 2] = 255  # Blue stripe
+    return img_array
+
+
+def make_halves():
+    """Left half red, right half black"""
+    img_array = np.zeros((4, 6, 3), dtype=np.uint8)
+    img_array[:, :3] = [255, 0, 0]
+    return img_array
+
+
+FIXTURES = {
+    "noise": lambda: np.random.default_rng(0).integers(0, 256, (10, 10, 3), dtype=np.uint8),
+    "gray": lambda: np.full((5, 5, 3), 128, dtype=np.uint8),
+    "stripes": make_stripes,
+    "halves": make_halves,
+    # Incompressible, so the PNG exceeds MMAP_THRESHOLD (64 KiB) in src/lib.rs
+    "large_noise": lambda: np.random.default_rng(1).integers(0, 256, (192, 192, 3), dtype=np.uint8),
+}
+
+
+@lru_cache(maxsize=None)
+def fixture_png(name):
+    """Return (path, pixels) of the named fixture, writing the PNG on first use"""
+    img_array = FIXTURES[name]()
+    img_array.setflags(write=False)  # Shared between tests
+    path = os.path.join(FIXTURE_DIR.name, f"{name}.png")
+    Image.fromarray(img_array).save(path, "PNG")
+    return path, img_array
+
+
+# Formats of the mixed batch, in the order they repeat; None is a missing file
+MIXED_FORMATS = ["PNG", "JPEG", "BMP", None]
+MIXED_EXTENSIONS = {"PNG": "png", "JPEG": "jpg", "BMP": "bmp", None: "png"}
+
+
+def mixed_batch():
+    """Write 20 files interleaving formats and missing ones; return (paths, expected pixels).
+
+    Every image has its own size and color, so one returned at the wrong index
+    cannot match. Expected pixels are None where the file does not exist.
+    """
+    paths = []
+    expected = []
+    for i in range(20):
+        fmt = MIXED_FORMATS[i % len(MIXED_FORMATS)]
+        path = os.path.join(FIXTURE_DIR.name, f"mixed_{i:02d}.{MIXED_EXTENSIONS[fmt]}")
+        img_array = None
+        if fmt is not None:
+            img_array = np.empty((8 + i, 16 + i, 3), dtype=np.uint8)
+            img_array[...] = [(i * 40) & 0xFF, (i * 70) & 0xFF, 255 - i * 10]
+            Image.fromarray(img_array).save(path, fmt)
+        paths.append(path)
+        expected.append(img_array)
+    return paths, expected
+
+
+# PNG color type by number of channels: gray, gray + alpha, RGB, RGBA
+PNG_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}
+
+
+def save_png16(path, img_array):
+    """Write a 16-bit PNG of 1 to 4 channels (Pillow can only write 16-bit grayscale)"""
+    height, width, channels = img_array.shape
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    # Filter type 0 (none) before each row of big-endian samples
+    raw = b"".join(b"\x00" + row.tobytes() for row in img_array.astype(">u2"))
+    header = struct.pack(">IIBBBBB", width, height, 16, PNG_COLOR_TYPES[channels], 0, 0, 0)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", header))
+        f.write(chunk(b"IDAT", zlib.compress(raw)))
+        f.write(chunk(b"IEND", b""))
+
+
+def round_16_to_8(values):
+    """16 to 8 bit conversion of the image crate: v * 255 / 65535, rounded"""
+    return ((values.astype(np.uint32) + 128) // 257).astype(np.uint8)
+
+
+def png_color_types():
+    """Write PNGs of every color type; return (label, path, expected RGB pixels) for each.
+
+    8-bit images are expected to match Pillow's convert('RGB'). 16-bit images
+    are expected to match the rounding of the image crate, which images_rs
+    used for them before decoding PNGs with zune-png.
+    """
+    rng = np.random.default_rng(6)
+    height, width = 7, 9
+    fixtures = []
+
+    def add(label, img, **save_args):
+        path = os.path.join(FIXTURE_DIR.name, f"color_{label}.png")
+        img.save(path, "PNG", **save_args)
+        with Image.open(path) as saved:
+            expected = np.asarray(saved.convert("RGB"))
+        fixtures.append((label, path, expected))
+
+    add("rgba", Image.fromarray(rng.integers(0, 256, (height, width, 4), dtype=np.uint8)))
+    add("l", Image.fromarray(rng.integers(0, 256, (height, width), dtype=np.uint8)))
+    add("la", Image.fromarray(rng.integers(0, 256, (height, width, 2), dtype=np.uint8)))
+
+    # RGB with one color marked transparent (tRNS chunk)
+    rgb = rng.integers(0, 4, (height, width, 3), dtype=np.uint8) * 85
+    add("rgb_trns", Image.fromarray(rgb), transparency=(0, 85, 170))
+
+    # 1-bit grayscale; the odd width leaves padding bits at the end of each row
+    add("l1", Image.fromarray(rng.integers(0, 2, (height, width), dtype=np.uint8) > 0))
+
+    # Palettes of 1, 2, 4 and 8 bits per pixel; the first entry is fully
+    # transparent (tRNS chunk)
+    for bits in (1, 2, 4, 8):
+        colors = min(1 << bits, 16)
+        indices = rng.integers(0, colors, (height, width), dtype=np.uint8)
+        palette = Image.frombytes("P", (width, height), indices.tobytes())
+        palette.putpalette(rng.integers(0, 256, colors * 3, dtype=np.uint8).tolist())
+        add(f"palette{bits}_trns", palette, transparency=0, bits=bits)
+
+    gray16 = rng.integers(0, 65536, (height, width), dtype=np.uint16)
+    path = os.path.join(FIXTURE_DIR.name, "color_l16.png")
+    Image.fromarray(gray16).save(path, "PNG")
+    fixtures.append(("l16", path, np.repeat(round_16_to_8(gray16)[:, :, None], 3, axis=2)))
+
+    # Alpha is dropped, and gray is replicated to all three channels
+    for label, channels in (("la16", 2), ("rgb16", 3), ("rgba16", 4)):
+        samples = rng.integers(0, 65536, (height, width, channels), dtype=np.uint16)
+        path = os.path.join(FIXTURE_DIR.name, f"color_{label}.png")
+        save_png16(path, samples)
+        color = samples[:, :, :1].repeat(3, axis=2) if channels < 3 else samples[:, :, :3]
+        fixtures.append((label, path, round_16_to_8(color)))
+
+    return fixtures
+
 
 def test_import():
     """Test that the module imports successfully"""
+    # Attribute checks belong here, never inside a timed section
     assert hasattr(images_rs, "read")
+    assert hasattr(images_rs, "decode")
+    assert hasattr(images_rs, "init_pool")
     print("✅ Import test passed")
 
 
@@ -24,6 +177,18 @@ def test_empty_list():
     print("✅ Empty list test passed")
 
 
+def test_init_pool():
+    """Test that the global thread pool is only created once"""
+    # True unless an earlier test already started the pool
+    assert isinstance(images_rs.init_pool(), bool)
+
+    # Either way the pool exists now, and reading uses it
+    images_rs.read([])
+    assert images_rs.init_pool() is False
+    assert images_rs.init_pool(2) is False
+    print("✅ Init pool test passed")
+
+
 def test_nonexistent_files():
     """Test with non-existent files"""
     result = images_rs.read(["nonexistent1.png", "nonexistent2.jpg"])
@@ -35,97 +200,156 @@ def test_nonexistent_files():
 
 def test_with_real_image():
     """Test with a real generated image"""
-    # Create a temporary test image
-    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-        # Create a simple 10x10 test image
-        img_array = np.random.randint(0, 256, (10, 10, 3), dtype=np.uint8)
-        img = Image.fromarray(img_array)
-        img.save(tmp.name, "PNG")
-
-        try:
-            # Test reading the image
-            result = images_rs.read([tmp.name])
+    path, img_array = fixture_png("noise")
 
-            assert len(result) == 1
-            assert result[0] is not None
+    result = images_rs.read([path])
 
-            # Check the result
-            loaded_array = result[0]
-            assert loaded_array.shape == (10, 10, 3)
-            assert loaded_array.dtype == np.uint8
+    assert len(result) == 1
+    assert result[0] is not None
 
-            print("✅ Real image test passed")
+    # Check the result
+    loaded_array = result[0]
+    assert loaded_array.shape == (10, 10, 3)
+    assert loaded_array.dtype == np.uint8
+    assert np.array_equal(loaded_array, img_array)
 
-        finally:
-            # Clean up
-            os.unlink(tmp.name)
+    print("✅ Real image test passed")
 
 
 def test_thread_parameter():
     """Test the num_threads parameter"""
-    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-        # Create a simple test image
-        img_array = np.ones((5, 5, 3), dtype=np.uint8) * 128  # Gray image
-        img = Image.fromarray(img_array)
-        img.save(tmp.name, "PNG")
+    path, _ = fixture_png("gray")
+
+    # Test with specific thread count
+    result = images_rs.read([path], num_threads=1)
+
+    assert len(result) == 1
+    assert result[0] is not None
+    assert result[0].shape == (5, 5, 3)
+
+    print("✅ Thread parameter test passed")
 
-        try:
-            # Test with specific thread count
-            result = images_rs.read([tmp.name], num_threads=1)
 
-            assert len(result) == 1
-            assert result[0] is not None
-            assert result[0].shape == (5, 5, 3)
+def test_thread_pool_reuse():
+    """Test repeated calls with the same and different num_threads"""
+    fixtures = [fixture_png(name) for name in ("noise", "gray", "stripes")]
+    paths = [path for path, _ in fixtures]
+    buffers = []
+    for path in paths:
+        with open(path, "rb") as f:
+            buffers.append(f.read())
 
-            print("✅ Thread parameter test passed")
+    # The second call with 3 threads reuses the pool built by the first
+    for num_threads in (3, 3, 4):
+        for result in (images_rs.read(paths, num_threads=num_threads),
+                       images_rs.decode(buffers, num_threads=num_threads)):
+            assert len(result) == len(fixtures)
+            for loaded_array, (_, img_array) in zip(result, fixtures):
+                assert loaded_array is not None
+                assert np.array_equal(loaded_array, img_array)
 
-        finally:
-            os.unlink(tmp.name)
+    print("✅ Thread pool reuse test passed")
 
 
 def test_image_content():
     """Test that the actual pixel values are read correctly"""
-    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-        # Create a test image with known pixel values
-        # Red, Green, Blue stripes
-        img_array = np.zeros((3, 3, 3), dtype=np.uint8)
-        img_array[0, :, 0] = 255  # Red stripe
-        img_array[1, :, 1] = 255  # Green stripe  
-        img_array[2, :, 2] = 255  # Blue stripe
-        
-        img = Image.fromarray(img_array)
-        img.save(tmp.name, "PNG")
-
-        try:
-            # Read the image back
-            result = images_rs.read([tmp.name])
-            
-            assert len(result) == 1
-            assert result[0] is not None
-            
-            loaded_array = result[0]
-            assert loaded_array.shape == (3, 3, 3)
-            
-            # Check specific pixel values
-            # Red stripe (row 0)
-            assert loaded_array[0, 0, 0] == 255  # Red channel
-            assert loaded_array[0, 0, 1] == 0    # Green channel
-            assert loaded_array[0, 0, 2] == 0    # Blue channel
-            
-            # Green stripe (row 1)  
-            assert loaded_array[1, 0, 0] == 0    # Red channel
-            assert loaded_array[1, 0, 1] == 255  # Green channel
-            assert loaded_array[1, 0, 2] == 0    # Blue channel
-            
-            # Blue stripe (row 2)
-            assert loaded_array[2, 0, 0] == 0    # Red channel
-            assert loaded_array[2, 0, 1] == 0    # Green channel  
-            assert loaded_array[2, 0, 2] == 255  # Blue channel
-
-            print("✅ Image content validation test passed")
-
-        finally:
-            os.unlink(tmp.name)
+    path, _ = fixture_png("stripes")
+
+    result = images_rs.read([path])
+
+    assert len(result) == 1
+    assert result[0] is not None
+
+    loaded_array = result[0]
+    assert loaded_array.shape == (3, 3, 3)
+
+    # Check specific pixel values
+    # Red stripe (row 0)
+    assert loaded_array[0, 0, 0] == 255  # Red channel
+    assert loaded_array[0, 0, 1] == 0    # Green channel
+    assert loaded_array[0, 0, 2] == 0    # Blue channel
+
+    # Green stripe (row 1)
+    assert loaded_array[1, 0, 0] == 0    # Red channel
+    assert loaded_array[1, 0, 1] == 255  # Green channel
+    assert loaded_array[1, 0, 2] == 0    # Blue channel
+
+    # Blue stripe (row 2)
+    assert loaded_array[2, 0, 0] == 0    # Red channel
+    assert loaded_array[2, 0, 1] == 0    # Green channel
+    assert loaded_array[2, 0, 2] == 255  # Blue channel
+
+    print("✅ Image content validation test passed")
+
+
+def test_decode_bytes():
+    """Test decoding in-memory image data"""
+    path, img_array = fixture_png("halves")
+    with open(path, "rb") as f:
+        data = f.read()
+
+    result = images_rs.decode([data, b"not an image"])
+
+    assert len(result) == 2
+    assert result[0] is not None
+    assert result[1] is None
+    assert result[0].shape == (4, 6, 3)
+    assert np.array_equal(result[0], img_array)
+
+    print("✅ Decode bytes test passed")
+
+
+def test_large_file():
+    """Test a file large enough to be memory-mapped instead of read into memory"""
+    path, img_array = fixture_png("large_noise")
+    assert os.path.getsize(path) >= 64 * 1024
+
+    result = images_rs.read([path])
+
+    assert len(result) == 1
+    assert result[0] is not None
+    assert np.array_equal(result[0], img_array)
+
+    print("✅ Large file test passed")
+
+
+def test_png_color_types():
+    """Test RGB conversion of PNGs with alpha, grayscale, palette and 16-bit samples"""
+    fixtures = png_color_types()
+
+    result = images_rs.read([path for _, path, _ in fixtures])
+
+    assert len(result) == len(fixtures)
+    for (label, _, expected), loaded_array in zip(fixtures, result):
+        assert loaded_array is not None, label
+        assert loaded_array.shape == expected.shape, label
+        assert np.array_equal(loaded_array, expected), label
+
+    print("✅ PNG color types test passed")
+
+
+def test_mixed_batch():
+    """Test that a mixed-format batch comes back in input order"""
+    paths, expected = mixed_batch()
+
+    # Two threads for 20 images makes each task decode several images in a row
+    result = images_rs.read(paths, num_threads=2)
+
+    assert len(result) == len(paths)
+    for path, loaded_array, img_array in zip(paths, result, expected):
+        if img_array is None:
+            assert loaded_array is None, path
+            continue
+        assert loaded_array is not None, path
+        assert loaded_array.shape == img_array.shape, path
+        if path.endswith(".jpg"):
+            # Lossy: allow for rounding in the encoder and the decoder
+            diff = np.abs(loaded_array.astype(np.int16) - img_array).max()
+            assert diff <= 8, (path, diff)
+        else:
+            assert np.array_equal(loaded_array, img_array), path
+
+    print("✅ Mixed batch test passed")
 
 
 def run_all_tests():
@@ -134,10 +358,16 @@ def run_all_tests():
 
     test_import()
     test_empty_list()
+    test_init_pool()
     test_nonexistent_files()
     test_with_real_image()
     test_thread_parameter()
+    test_thread_pool_reuse()
     test_image_content()
+    test_decode_bytes()
+    test_large_file()
+    test_png_color_types()
+    test_mixed_batch()
 
     print("🎉 All tests passed!")
 
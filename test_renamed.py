@@ -20,7 +20,8 @@ def test_renamed_module():
     print("Available functions:", dir(images_rs))
     print()
 
-    # Test the main function
+    # Test the main function. Only the read call sits inside the timed
+    # window; introspection (dir, hasattr) and printing stay outside it.
     start = time.perf_counter()
     result = images_rs.read(avif_paths)
     end = time.perf_counter()